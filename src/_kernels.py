@@ -0,0 +1,120 @@
+"""Rolling-window kernels behind the Bollinger, ATR and AB indicators.
+
+With numba installed, 1-D inputs run through single-pass compiled loops (running sums
+over the window); without it, and for 2-D batches, the vectorized numpy versions are
+used. Both return NaN until a window is full or while it contains a NaN.
+"""
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional
+    njit = None
+
+
+def _rolling_mean_np(x: np.ndarray, length: int) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= length:
+        out[..., length - 1:] = sliding_window_view(x, length, axis=-1).mean(axis=-1)
+    return out
+
+
+def _rolling_mean_std_np(x: np.ndarray, length: int):
+    ma = np.full(x.shape, np.nan)
+    std = np.full(x.shape, np.nan)
+    if x.shape[-1] >= length:
+        win = sliding_window_view(x, length, axis=-1)
+        ma[..., length - 1:] = win.mean(axis=-1)
+        std[..., length - 1:] = win.std(axis=-1)
+    return ma, std
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _rolling_mean_std_1d(x, length):
+        n = x.shape[0]
+        ma = np.full(n, np.nan)
+        std = np.full(n, np.nan)
+        # Sums are taken around the first valid value to limit cancellation in the variance
+        shift = 0.0
+        for i in range(n):
+            if not np.isnan(x[i]):
+                shift = x[i]
+                break
+        s = 0.0
+        ss = 0.0
+        nans = 0
+        for i in range(n):
+            v = x[i]
+            if np.isnan(v):
+                nans += 1
+            else:
+                s += v - shift
+                ss += (v - shift) * (v - shift)
+            if i >= length:
+                w = x[i - length]
+                if np.isnan(w):
+                    nans -= 1
+                else:
+                    s -= w - shift
+                    ss -= (w - shift) * (w - shift)
+            if i >= length - 1 and nans == 0:
+                m = s / length
+                var = ss / length - m * m
+                ma[i] = m + shift
+                std[i] = math.sqrt(var) if var > 0.0 else 0.0
+        return ma, std
+
+    @njit(cache=True)
+    def _rolling_mean_1d(x, length):
+        n = x.shape[0]
+        out = np.full(n, np.nan)
+        s = 0.0
+        nans = 0
+        for i in range(n):
+            v = x[i]
+            if np.isnan(v):
+                nans += 1
+            else:
+                s += v
+            if i >= length:
+                w = x[i - length]
+                if np.isnan(w):
+                    nans -= 1
+                else:
+                    s -= w
+            if i >= length - 1 and nans == 0:
+                out[i] = s / length
+        return out
+
+
+def rolling_mean(x: np.ndarray, length: int) -> np.ndarray:
+    """Trailing-window mean along the last axis."""
+    if njit is not None and x.ndim == 1:
+        return _rolling_mean_1d(x, length)
+    return _rolling_mean_np(x, length)
+
+
+def rolling_mean_std(x: np.ndarray, length: int):
+    """Trailing-window mean and population std (ddof=0) along the last axis."""
+    if njit is not None and x.ndim == 1:
+        return _rolling_mean_std_1d(x, length)
+    return _rolling_mean_std_np(x, length)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = np.empty_like(close)
+    prev_close[..., 0] = np.nan
+    prev_close[..., 1:] = close[..., :-1]
+    # fmax ignores the missing previous close on the first bar, like pandas' row-wise max
+    return np.fmax.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+
+
+def ab(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int, mult: float) -> np.ndarray:
+    """AB = Bollinger half-band (mult * std) over ATR, along the last axis."""
+    _, std = rolling_mean_std(close, length)
+    atr_v = rolling_mean(true_range(high, low, close), length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return mult * std / atr_v
@@ -0,0 +1,106 @@
+"""YAML config loading shared by the entry points."""
+import copy
+import hashlib
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import yaml
+
+try:
+    from orjson import dumps as _json_dumps, loads as _json_loads
+except ImportError:  # orjson is optional; stdlib json round-trips the same documents
+    import json
+    from json import loads as _json_loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+# libyaml-backed loader when PyYAML was built with it, same semantics as safe_load
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# abspath -> (mtime_ns, parsed document)
+_cache: Dict[str, Tuple[int, Any]] = {}
+
+# With CONFIG_CACHE=1, parsed configs are also kept as JSON in shared memory so the next run
+# can skip the YAML parse. POSIX only: the entry holds the bot token, and only there can it be
+# made owner-only and checked for ownership before it is trusted.
+_SHM_DIR = '/dev/shm'
+_MISSING = object()
+
+
+def _shared_cache_path(key: str) -> Optional[str]:
+    if os.getenv('CONFIG_CACHE') != '1' or not hasattr(os, 'getuid') or not os.path.isdir(_SHM_DIR):
+        return None
+    # Stable across processes (unlike hash()); per user, so users never read each other's entries
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(_SHM_DIR, f"tvscan_cfg_{os.getuid()}_{digest}.json")
+
+
+def _read_shared(path: str, mtime: int) -> Any:
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+    except OSError:
+        return _MISSING
+    with os.fdopen(fd, 'rb') as f:
+        st = os.fstat(f.fileno())
+        # Only trust private files of our own; /dev/shm is writable by everyone
+        if st.st_uid != os.getuid() or st.st_mode & 0o077:
+            return _MISSING
+        data = f.read()
+    try:
+        entry = _json_loads(data)
+    except ValueError:
+        return _MISSING
+    # Written for another version of the file: stale
+    if not isinstance(entry, dict) or entry.get('mtime_ns') != mtime or 'doc' not in entry:
+        return _MISSING
+    return entry['doc']
+
+
+def _write_shared(path: str, mtime: int, doc: Any) -> None:
+    try:
+        payload = _json_dumps({'mtime_ns': mtime, 'doc': doc})
+        if _json_loads(payload)['doc'] != doc:
+            return  # e.g. YAML dates: JSON would not give the same document back
+    except (TypeError, ValueError):
+        return  # e.g. non-string keys
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        # The config holds the bot token: owner-only, written aside and renamed into place
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+        try:
+            os.write(fd, payload)
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def load_yaml(path: str) -> Any:
+    """Parse a YAML file, reusing the last result while the file's mtime is unchanged.
+
+    Results are kept in-process; with CONFIG_CACHE=1 they are also written as JSON to /dev/shm
+    (where available) so the next script run skips the YAML parse too.
+    Each caller gets its own deep copy, so mutating the result does not leak into the cache.
+    Raises FileNotFoundError when the file does not exist.
+    """
+    key = os.path.abspath(path)
+    mtime = os.stat(key).st_mtime_ns
+    hit = _cache.get(key)
+    if hit is None or hit[0] != mtime:
+        shared = _shared_cache_path(key)
+        doc = _read_shared(shared, mtime) if shared else _MISSING
+        if doc is _MISSING:
+            # One read of the raw bytes; the loader detects the encoding (UTF-8 unless a BOM says otherwise)
+            with open(key, 'rb') as f:
+                data = f.read()
+            doc = yaml.load(data, Loader=SafeLoader)
+            if shared:
+                _write_shared(shared, mtime, doc)
+        hit = (mtime, doc)
+        _cache[key] = hit
+    return copy.deepcopy(hit[1])
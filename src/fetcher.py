@@ -2,12 +2,104 @@ from datetime import datetime, timezone
 from binance.spot import Spot
 import time
 import logging
+import threading
+from functools import lru_cache
+from concurrent.futures import Future, wait, FIRST_COMPLETED
 from typing import List, Dict, Any, Optional
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # orjson is optional; stdlib json gives the same Python objects
+    from json import loads as _json_loads
 
 logger = logging.getLogger(__name__)
 
+
+# Bar length per Binance interval, used to decide how long fetched klines stay fresh
+_INTERVAL_SECONDS = {
+    '1s': 1, '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+    '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '8h': 28800, '12h': 43200,
+    '1d': 86400, '3d': 259200, '1w': 604800, '1M': 2592000,
+}
+# Minimum cache lifetime; also used for the 24h ticker
+_CACHE_MIN_TTL = 60
+
+
+def _cache_ttl(interval: str) -> int:
+    # Reuse klines for 1/60 of a bar (1d -> 24 min, 1w -> ~2.8 h), never less than a minute
+    return max(_CACHE_MIN_TTL, _INTERVAL_SECONDS.get(interval, 0) // 60)
+
+
+# Binance IP limit is 1200 weight/minute; keep some headroom for other callers
+_WEIGHT_LIMIT_1M = 1000
+# Spot GET /api/v3/klines costs the same at any limit
+_KLINES_WEIGHT = 2
+
+
+class _WeightBudget:
+    """Request weight spent in the current one-minute window, shared across threads."""
+
+    def __init__(self, limit: int = _WEIGHT_LIMIT_1M, window: float = 60.0):
+        self.limit = limit
+        self.window = window
+        self.used = 0
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _roll(self, now: float):
+        if now - self._start >= self.window:
+            self._start = now
+            self.used = 0
+
+    def spend(self, weight: int):
+        """Reserve `weight`, sleeping until the window resets if the budget is exhausted."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._roll(now)
+                if self.used + weight <= self.limit:
+                    self.used += weight
+                    return
+                delay = self.window - (now - self._start)
+            logger.info("Binance weight budget exhausted (%d/%d); waiting %.1fs", self.used, self.limit, delay)
+            time.sleep(delay)
+
+    def observe(self, used: int):
+        """Sync with the server's X-MBX-USED-WEIGHT-1M header."""
+        with self._lock:
+            self._roll(time.monotonic())
+            self.used = max(self.used, used)
+
+
+def _pooled_adapter(read_retries: int = 3) -> HTTPAdapter:
+    # Sized for concurrent scans so connections are kept alive instead of being dropped when the pool is full
+    retry = Retry(total=3, read=read_retries, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET'], raise_on_status=False)
+    return HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retry)
+
+
+def _run_daemon(fn, *args) -> Future:
+    """Run `fn(*args)` on a daemon thread and return its Future.
+
+    Unlike ThreadPoolExecutor workers, the thread is not joined at interpreter exit, so a
+    request that lost a hedge race cannot keep a one-shot run alive until it times out.
+    """
+    fut = Future()
+
+    def run():
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(fn(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=run, name='binance-mirror', daemon=True).start()
+    return fut
+
 class BinanceFetcher:
     def __init__(self, symbols: List[str], interval: str):
         # Optional: allow proxy and base_url override via environment variables for CI/regions
@@ -39,9 +131,55 @@ class BinanceFetcher:
                 'https://api-gcp.binance.com'
             ]
         self.requests_session = requests.Session()
+        self.requests_session.headers['Connection'] = 'keep-alive'
+        # Mirror requests are hedged, so a read timeout is not retried: the next mirror already covers it
+        self.requests_session.mount('https://', _pooled_adapter(read_retries=0))
         if proxies:
             self.requests_session.proxies.update(proxies)
+        # The official client keeps its own requests.Session; give it the same pool
+        client_session = getattr(self.client, 'session', None)
+        if isinstance(client_session, requests.Session):
+            client_session.mount('https://', _pooled_adapter())
+        # Optional HTTP/2 client (httpx[http2]) that multiplexes mirror requests over one connection
+        self.http2_client = self._make_http2_client(proxy) if os.getenv('BINANCE_HTTP2') == '1' else None
+        # A mirror that has not answered after this many seconds is raced against the next one
+        self.mirror_hedge_delay = float(os.getenv('BINANCE_MIRROR_HEDGE_DELAY', '2.0'))
+        self.weight_budget = _WeightBudget()
         self.last_source: Optional[str] = None  # 'binance_client' | 'binance_http' | 'yfinance'
+        # In-memory TTL cache of raw responses, shared by all callers of this fetcher
+        self.cache_enabled = os.getenv('BINANCE_CACHE', '1') != '0'
+        self._cache: Dict[Any, Any] = {}
+        self._cache_lock = threading.Lock()
+
+    def _cache_get(self, key, ttl: float):
+        if not self.cache_enabled:
+            return None
+        with self._cache_lock:
+            entry = self._cache.get(key)
+        # Entries keep their fetch time, so each caller can apply its own freshness bound
+        if entry is not None and time.time() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    def _cache_put(self, key, data):
+        if self.cache_enabled and data:
+            with self._cache_lock:
+                self._cache[key] = (time.time(), data)
+
+    @staticmethod
+    def _make_http2_client(proxy: Optional[str]):
+        try:
+            import httpx
+            import h2  # noqa: F401  (required by httpx for http2=True)
+        except Exception:
+            logger.warning("BINANCE_HTTP2=1 but httpx[http2] is not installed; using requests for mirrors")
+            return None
+        kwargs = {'http2': True, 'timeout': 15.0, 'limits': httpx.Limits(max_connections=64, max_keepalive_connections=32)}
+        try:
+            return httpx.Client(proxy=proxy, **kwargs)
+        except TypeError:
+            # Older httpx versions take 'proxies' instead of 'proxy'
+            return httpx.Client(proxies=proxy, **kwargs)
 
     def get_price(self, symbol: str) -> float:
         try:
@@ -50,27 +188,41 @@ class BinanceFetcher:
             return float(data['price'])
         except Exception:
             # fallback to HTTP REST
-            for base in self.mirror_urls:
-                try:
-                    url = f"{base}/api/v3/ticker/price"
-                    r = self.requests_session.get(url, params={'symbol': symbol}, timeout=10)
-                    if r.status_code == 200:
-                        self.last_source = 'binance_http'
-                        return float(r.json()['price'])
-                except Exception:
-                    continue
+            data = self._get_from_mirrors('/api/v3/ticker/price', params={'symbol': symbol}, timeout=10)
+            if data is not None:
+                self.last_source = 'binance_http'
+                return float(data['price'])
             raise
 
-    def get_klines(self, symbol: str, interval: str = None, limit: int = 200) -> List[List[Any]]:
+    def get_klines(self, symbol: str, interval: str = None, limit: int = 200, max_age: Optional[float] = None) -> List[List[Any]]:
+        """Klines, served from the response cache when fresh enough.
+
+        `max_age` (seconds) tightens the default lifetime; callers polling the forming bar pass
+        their poll interval so a cached copy never delays them by more than one tick.
+        """
         interval = interval or self.interval
+        key = ('klines', symbol, interval, limit)
+        ttl = _cache_ttl(interval)
+        if max_age is not None:
+            ttl = min(ttl, max_age)
+        data = self._cache_get(key, ttl)
+        if data is None:
+            data = self._get_klines_uncached(symbol, interval, limit)
+            self._cache_put(key, data)
+        return data
+
+    def _get_klines_uncached(self, symbol: str, interval: str, limit: int) -> List[List[Any]]:
+        # Every request counts against the shared budget, so concurrent scans cannot trip the IP limit
         # 1) Try official client first
         try:
+            self.weight_budget.spend(_KLINES_WEIGHT)
             data = self.client.klines(symbol, interval, limit=limit)
             self.last_source = 'binance_client'
             return data
         except Exception as e:
             msg = str(e).lower()
             # If region restricted or other failures, try HTTP mirrors
+            self.weight_budget.spend(_KLINES_WEIGHT)
             http_data = self._try_http_klines(symbol, interval, limit)
             if http_data is not None:
                 self.last_source = 'binance_http'
@@ -83,9 +235,15 @@ class BinanceFetcher:
             raise
 
     def get_klines_between(self, symbol: str, interval: str, start_ms: int, end_ms: int, limit: int = 1000) -> List[List[Any]]:
+        # No listing-date search is needed: Binance returns the first bars at or after
+        # startTime, so for a symbol listed inside the window the first page starts at listing.
+        if start_ms >= end_ms:
+            return []
         all_rows = []
         cursor = start_ms
         while True:
+            # Pages run back to back while the minute's weight budget allows it
+            self.weight_budget.spend(_KLINES_WEIGHT)
             batch = self.client.klines(symbol, interval, startTime=cursor, endTime=end_ms, limit=limit)
             if not batch:
                 break
@@ -94,37 +252,79 @@ class BinanceFetcher:
             if last_close >= end_ms or len(batch) < limit:
                 break
             cursor = last_close + 1
-            time.sleep(0.2)
         return all_rows
 
     @staticmethod
     def to_dataframe(raw: List[List[Any]]):
+        import numpy as np
         import pandas as pd
-        if not raw:
-            return pd.DataFrame(columns=["open_time","open","high","low","close","volume","close_time","quote_volume","trades","taker_buy_base","taker_buy_quote","ignore"])
         cols = ["open_time","open","high","low","close","volume","close_time","quote_volume","trades","taker_buy_base","taker_buy_quote","ignore"]
-        df = pd.DataFrame(raw, columns=cols)
-        numeric = ["open","high","low","close","volume"]
-        df[numeric] = df[numeric].astype(float)
-        df['open_time'] = pd.to_datetime(df['open_time'], unit='ms', utc=True)
-        df['close_time'] = pd.to_datetime(df['close_time'], unit='ms', utc=True)
-        df = df.set_index('open_time').sort_index()
+        if not raw:
+            return pd.DataFrame(columns=cols)
+        # Build every column straight from the rows with its final dtype; no object-array detour
+        n = len(raw)
+        data = {c: np.asarray([row[i] for row in raw], dtype=np.float64) for i, c in enumerate(cols[1:6], start=1)}
+        data['close_time'] = pd.to_datetime(np.fromiter((row[6] for row in raw), dtype=np.int64, count=n), unit='ms', utc=True)
+        data['quote_volume'] = [row[7] for row in raw]
+        data['trades'] = np.fromiter((row[8] for row in raw), dtype=np.int64, count=n)
+        for i, c in enumerate(cols[9:], start=9):
+            data[c] = [row[i] for row in raw]
+        open_time = pd.DatetimeIndex(pd.to_datetime(np.fromiter((row[0] for row in raw), dtype=np.int64, count=n), unit='ms', utc=True), name='open_time')
+        df = pd.DataFrame(data, index=open_time)
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
         return df
 
+    @staticmethod
+    def raw_to_ohlcv_arrays(raw: List[List[Any]]):
+        """Return (open, high, low, close, volume) float64 arrays from raw klines (oldest first)."""
+        import numpy as np
+        if not raw:
+            return tuple(np.empty(0, dtype=np.float64) for _ in range(5))
+        return tuple(np.asarray([row[i] for row in raw], dtype=np.float64) for i in range(1, 6))
+
     def _try_http_klines(self, symbol: str, interval: str, limit: int) -> Optional[List[List[Any]]]:
         params = {'symbol': symbol, 'interval': interval, 'limit': limit}
-        for base in self.mirror_urls:
-            try:
-                url = f"{base}/api/v3/klines"
-                r = self.requests_session.get(url, params=params, timeout=15)
-                if r.status_code == 200:
-                    return r.json()
-                # Continue trying other mirrors on 4xx/5xx
-            except Exception:
-                continue
+        return self._get_from_mirrors('/api/v3/klines', params=params, timeout=15)
+
+    def _fetch_json(self, base: str, path: str, params: Optional[Dict[str, Any]], timeout: float) -> Optional[Any]:
+        try:
+            session = self.http2_client or self.requests_session
+            r = session.get(f"{base}{path}", params=params, timeout=timeout)
+            used = r.headers.get('X-MBX-USED-WEIGHT-1M')
+            if used and used.isdigit():
+                self.weight_budget.observe(int(used))
+            if r.status_code == 200:
+                return _json_loads(r.content)
+        except Exception:
+            pass
+        return None
+
+    def _get_from_mirrors(self, path: str, params: Optional[Dict[str, Any]] = None, timeout: float = 15) -> Optional[Any]:
+        """GET `path` from the mirrors and return the first successful JSON body, or None.
+
+        Mirrors are tried in order, but one that stalls for longer than `mirror_hedge_delay`
+        is raced against the next instead of blocking for its full timeout; a mirror that
+        fails outright hands over to the next immediately.
+        """
+        pending = set()
+        for base in self.mirror_urls + [None]:
+            if base is not None:
+                pending.add(_run_daemon(self._fetch_json, base, path, params, timeout))
+            while pending:
+                done, pending = wait(pending, timeout=self.mirror_hedge_delay if base is not None else None, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    data = fut.result()
+                    if data is not None:
+                        for p in pending:
+                            p.cancel()
+                        return data
+                if base is not None:
+                    break  # hedge delay elapsed or a mirror failed: bring in the next one
         return None
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def _map_symbol_to_yf(symbol: str) -> Optional[str]:
         # Map 'BTCUSDT' -> 'BTC-USD'; simple heuristic for USDT pairs; skip leveraged tokens
         if not symbol.endswith('USDT'):
@@ -182,6 +382,7 @@ class BinanceFetcher:
             return None
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def _infer_yf_period(yf_interval: str, limit: int) -> str:
         # Choose a period that can cover 'limit' bars comfortably
         if yf_interval in ('1m','2m','5m','15m','30m'):
@@ -203,6 +404,13 @@ class BinanceFetcher:
         return '2y'
 
     def fetch_ticker_24hr(self) -> Optional[List[Dict[str, Any]]]:
+        data = self._cache_get('ticker_24hr', _CACHE_MIN_TTL)
+        if data is None:
+            data = self._fetch_ticker_24hr_uncached()
+            self._cache_put('ticker_24hr', data)
+        return data
+
+    def _fetch_ticker_24hr_uncached(self) -> Optional[List[Dict[str, Any]]]:
         # Try client first
         try:
             data = self.client.ticker_24hr()
@@ -210,13 +418,27 @@ class BinanceFetcher:
             return data
         except Exception:
             # Try HTTP mirrors
-            for base in self.mirror_urls:
-                try:
-                    url = f"{base}/api/v3/ticker/24hr"
-                    r = self.requests_session.get(url, timeout=15)
-                    if r.status_code == 200:
-                        self.last_source = 'binance_http'
-                        return r.json()
-                except Exception:
-                    continue
+            data = self._get_from_mirrors('/api/v3/ticker/24hr', timeout=15)
+            if data is not None:
+                self.last_source = 'binance_http'
+                return data
         return None
+
+
+_FETCHER: Optional[BinanceFetcher] = None
+_FETCHER_LOCK = threading.Lock()
+
+
+def get_fetcher(symbols: Optional[List[str]] = None, interval: str = '1d') -> BinanceFetcher:
+    """Process-wide BinanceFetcher, created on first use.
+
+    Sharing one instance shares the Spot client, HTTP connection pools, cache and weight
+    budget between entry points. `symbols`/`interval` only apply when the fetcher is
+    created, so callers should pass the interval to get_klines explicitly.
+    """
+    global _FETCHER
+    if _FETCHER is None:
+        with _FETCHER_LOCK:
+            if _FETCHER is None:
+                _FETCHER = BinanceFetcher(symbols or [], interval)
+    return _FETCHER
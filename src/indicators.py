@@ -1,17 +1,22 @@
+import math
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from dataclasses import dataclass
+from typing import Dict, Any, NamedTuple, Optional
+
+from src import _kernels
 
 def ema(series: pd.Series, period: int) -> pd.Series:
     return series.ewm(span=period, adjust=False).mean()
 
 def rsi(series: pd.Series, period: int = 14) -> pd.Series:
+    """Wilder's RSI (as on TradingView): gains/losses smoothed with alpha = 1/period."""
     delta = series.diff()
-    gain = np.where(delta > 0, delta, 0.0)
-    loss = np.where(delta < 0, -delta, 0.0)
-    gain_rol = pd.Series(gain, index=series.index).rolling(window=period).mean()
-    loss_rol = pd.Series(loss, index=series.index).rolling(window=period).mean()
-    rs = gain_rol / loss_rol
+    gain = delta.clip(lower=0)
+    loss = (-delta).clip(lower=0)
+    avg_gain = gain.ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    avg_loss = loss.ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    rs = avg_gain / avg_loss
     rsi = 100 - (100 / (1 + rs))
     return rsi
 
@@ -31,57 +36,210 @@ def bollinger(series: pd.Series, length: int = 20, mult: float = 2.0) -> pd.Data
     return pd.DataFrame({"bb_middle": ma, "bb_upper": upper, "bb_lower": lower, "bb_std": std})
 
 def true_range(df: pd.DataFrame) -> pd.Series:
-    prev_close = df['close'].shift(1)
-    hi_lo = df['high'] - df['low']
-    hi_pc = (df['high'] - prev_close).abs()
-    lo_pc = (df['low'] - prev_close).abs()
-    tr = pd.concat([hi_lo, hi_pc, lo_pc], axis=1).max(axis=1)
-    return tr
+    tr = _kernels.true_range(df['high'].to_numpy(dtype=np.float64), df['low'].to_numpy(dtype=np.float64), df['close'].to_numpy(dtype=np.float64))
+    return pd.Series(tr, index=df.index)
 
 def atr(df: pd.DataFrame, length: int = 14) -> pd.Series:
     return true_range(df).rolling(length).mean()
 
+class BbAtr(NamedTuple):
+    """bb_atr_signal columns as numpy arrays."""
+    bb_middle: np.ndarray
+    bb_upper: np.ndarray
+    bb_lower: np.ndarray
+    bb_std: np.ndarray
+    bb_symmetry_ratio: np.ndarray
+    bb_halfband: np.ndarray
+    atr: np.ndarray
+    bb_halfband_over_atr: np.ndarray
+
+def bb_atr_signal_np(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 20, mult: float = 2.0) -> BbAtr:
+    """Array version of bb_atr_signal for callers that do not need a DataFrame."""
+    ma, std = _kernels.rolling_mean_std(close, length)
+    upper = ma + mult * std
+    lower = ma - mult * std
+    # (upper - middle) and (middle - lower)
+    up_mid = upper - ma
+    mid_low = ma - lower
+    atr_v = _kernels.rolling_mean(_kernels.true_range(high, low, close), length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = up_mid / mid_low
+        halfband_over_atr = up_mid / atr_v
+    return BbAtr(ma, upper, lower, std, ratio, up_mid, atr_v, halfband_over_atr)
+
 def bb_atr_signal(df: pd.DataFrame, length: int = 20, mult: float = 2.0) -> pd.DataFrame:
     """Compute Bollinger components and the ratio (upper-middle)/(middle-lower)."""
-    bb = bollinger(df['close'], length, mult)
-    out = df.join(bb)
-    # (upper - middle) and (middle - lower)
-    up_mid = out['bb_upper'] - out['bb_middle']
-    mid_low = out['bb_middle'] - out['bb_lower']
-    ratio = up_mid / mid_low
-    out['bb_symmetry_ratio'] = ratio
-    out['bb_halfband'] = up_mid
-    out['atr'] = atr(out, length)
-    out['bb_halfband_over_atr'] = out['bb_halfband'] / out['atr']
+    res = bb_atr_signal_np(
+        df['high'].to_numpy(dtype=np.float64), df['low'].to_numpy(dtype=np.float64),
+        df['close'].to_numpy(dtype=np.float64), length, mult,
+    )
+    return df.assign(**res._asdict())
+
+def _last_valid(x: np.ndarray) -> float:
+    valid = x[~np.isnan(x)]
+    return float(valid[-1]) if valid.size else float('nan')
+
+def _last_valid_rows(x: np.ndarray) -> np.ndarray:
+    """Last non-NaN value of each row of a 2D array (NaN for all-NaN rows)."""
+    valid = ~np.isnan(x)
+    idx = x.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    out = x[np.arange(x.shape[0]), idx]
+    out[~valid.any(axis=1)] = np.nan
     return out
 
+def weekly_ab_limit(length: int) -> int:
+    """Weekly bars to fetch for AB: length + 1 are needed, about twice that leaves room for gaps."""
+    return max(length * 2 + 5, 30)
+
 def compute_ab(df: pd.DataFrame, length: int = 20, mult: float = 2.0) -> pd.Series:
-    bb = bollinger(df['close'], length, mult)
-    halfband = bb['bb_upper'] - bb['bb_middle']  # == mult * std
-    tr_atr = atr(df, length)
-    return (halfband / tr_atr).rename('ab')
-
-def compute_weekly_ab(fetcher, symbol: str, weekly_interval: str, length: int = 20, mult: float = 2.0, limit: int = 100) -> float:
-    """Fetch weekly klines and compute latest AB_W value."""
-    raw = fetcher.get_klines(symbol, weekly_interval, limit=limit)
-    wdf = fetcher.to_dataframe(raw)
-    if wdf.empty:
+    ab = _kernels.ab(df['high'].to_numpy(dtype=np.float64), df['low'].to_numpy(dtype=np.float64), df['close'].to_numpy(dtype=np.float64), length, mult)
+    return pd.Series(ab, index=df.index, name='ab')
+
+def compute_weekly_ab(fetcher, symbol: str, weekly_interval: str, length: int = 20, mult: float = 2.0, limit: Optional[int] = None, max_age: Optional[float] = None) -> float:
+    """Fetch weekly klines and compute latest AB_W value.
+
+    AB needs `length` closes for the band and `length` true ranges (each with a previous
+    close) for the ATR, i.e. length + 1 bars; see weekly_ab_limit for the default limit.
+    `max_age` bounds how old a cached response may be (see BinanceFetcher.get_klines).
+    """
+    if limit is None:
+        limit = weekly_ab_limit(length)
+    raw = fetcher.get_klines(symbol, weekly_interval, limit=limit, max_age=max_age)
+    if not raw:
         return float('nan')
-    ab_series = compute_ab(wdf, length, mult)
-    return float(ab_series.dropna().iloc[-1]) if not ab_series.dropna().empty else float('nan')
+    _, high, low, close, _ = fetcher.raw_to_ohlcv_arrays(raw)
+    return _last_valid(_kernels.ab(high, low, close, length, mult))
+
+def compute_weekly_ab_batch(fetcher, raw_by_symbol: Dict[str, Any], length: int = 20, mult: float = 2.0) -> Dict[str, float]:
+    """Latest AB_W for several symbols from already fetched weekly klines, in one numpy pass.
+
+    Series are right-aligned (latest bar in the last column) and left-padded with NaN,
+    which leaves each row's AB exactly as compute_weekly_ab would compute it.
+    """
+    symbols = [sym for sym, raw in raw_by_symbol.items() if raw]
+    result = {sym: float('nan') for sym in raw_by_symbol}
+    if not symbols:
+        return result
+    width = max(len(raw_by_symbol[sym]) for sym in symbols)
+    high, low, close = (np.full((len(symbols), width), np.nan) for _ in range(3))
+    for row, sym in enumerate(symbols):
+        _, h, l, c, _ = fetcher.raw_to_ohlcv_arrays(raw_by_symbol[sym])
+        high[row, width - len(h):] = h
+        low[row, width - len(l):] = l
+        close[row, width - len(c):] = c
+    ab_w = _last_valid_rows(_kernels.ab(high, low, close, length, mult))
+    result.update(zip(symbols, ab_w.tolist()))
+    return result
 
 def compute_indicators(df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
-    out = df.copy()
-    price = out['close']
+    price = df['close']
+    new_cols = {}
     if config.get('include_ema'):
-        out['ema_fast'] = ema(price, config['ema']['fast'])
-        out['ema_slow'] = ema(price, config['ema']['slow'])
+        new_cols['ema_fast'] = ema(price, config['ema']['fast'])
+        new_cols['ema_slow'] = ema(price, config['ema']['slow'])
     if config.get('include_rsi'):
-        out['rsi'] = rsi(price, config['rsi']['period'])
+        new_cols['rsi'] = rsi(price, config['rsi']['period'])
     if config.get('include_macd'):
         m = macd(price, config['macd']['fast'], config['macd']['slow'], config['macd']['signal'])
-        out = out.join(m)
-    return out
+        new_cols.update(m.items())
+    # assign() makes the single copy of df with all new columns appended
+    return df.assign(**new_cols)
+
+@dataclass
+class IndicatorState:
+    """EMA/RSI/MACD recurrences as of the last closed bar, so a new bar costs O(1)."""
+    open_time: int  # open time (ms) of the last closed bar
+    close: float
+    ema_fast: float = math.nan
+    ema_slow: float = math.nan
+    rsi_gain: float = math.nan
+    rsi_loss: float = math.nan
+    macd_fast: float = math.nan
+    macd_slow: float = math.nan
+    macd_signal: float = math.nan
+
+def _ema_step(prev: float, x: float, span: int) -> float:
+    # ewm(span, adjust=False): y = y_prev + alpha * (x - y_prev)
+    return prev + 2.0 / (span + 1) * (x - prev)
+
+def _rsi_value(avg_gain: float, avg_loss: float) -> float:
+    if avg_loss == 0:
+        return math.nan if avg_gain == 0 else 100.0
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+def _state_step(state: IndicatorState, close: float, config: Dict[str, Any]) -> IndicatorState:
+    """State after one more bar closing at `close` (the input is not modified)."""
+    nxt = IndicatorState(open_time=state.open_time, close=close)
+    if config.get('include_ema'):
+        nxt.ema_fast = _ema_step(state.ema_fast, close, config['ema']['fast'])
+        nxt.ema_slow = _ema_step(state.ema_slow, close, config['ema']['slow'])
+    if config.get('include_rsi'):
+        alpha = 1.0 / config['rsi']['period']
+        delta = close - state.close
+        nxt.rsi_gain = state.rsi_gain + alpha * (max(delta, 0.0) - state.rsi_gain)
+        nxt.rsi_loss = state.rsi_loss + alpha * (max(-delta, 0.0) - state.rsi_loss)
+    if config.get('include_macd'):
+        nxt.macd_fast = _ema_step(state.macd_fast, close, config['macd']['fast'])
+        nxt.macd_slow = _ema_step(state.macd_slow, close, config['macd']['slow'])
+        nxt.macd_signal = _ema_step(state.macd_signal, nxt.macd_fast - nxt.macd_slow, config['macd']['signal'])
+    return nxt
+
+def _state_row(state: IndicatorState, config: Dict[str, Any]) -> Dict[str, float]:
+    row = {}
+    if config.get('include_ema'):
+        row['ema_fast'] = state.ema_fast
+        row['ema_slow'] = state.ema_slow
+    if config.get('include_rsi'):
+        row['rsi'] = _rsi_value(state.rsi_gain, state.rsi_loss)
+    if config.get('include_macd'):
+        macd_line = state.macd_fast - state.macd_slow
+        row.update(macd=macd_line, signal=state.macd_signal, hist=macd_line - state.macd_signal)
+    return row
+
+def seed_indicator_state(closed: pd.DataFrame, open_time: int, config: Dict[str, Any]) -> Optional[IndicatorState]:
+    """Full computation over closed bars; None if there is not enough history to stream from."""
+    price = closed['close']
+    state = IndicatorState(open_time=open_time, close=float(price.iloc[-1]))
+    if config.get('include_ema'):
+        state.ema_fast = float(ema(price, config['ema']['fast']).iloc[-1])
+        state.ema_slow = float(ema(price, config['ema']['slow']).iloc[-1])
+    if config.get('include_rsi'):
+        period = config['rsi']['period']
+        delta = price.diff()
+        state.rsi_gain = float(delta.clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean().iloc[-1])
+        state.rsi_loss = float((-delta).clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean().iloc[-1])
+    if config.get('include_macd'):
+        fast_ema = ema(price, config['macd']['fast'])
+        slow_ema = ema(price, config['macd']['slow'])
+        state.macd_fast = float(fast_ema.iloc[-1])
+        state.macd_slow = float(slow_ema.iloc[-1])
+        state.macd_signal = float(ema(fast_ema - slow_ema, config['macd']['signal']).iloc[-1])
+    used = []
+    if config.get('include_ema'):
+        used += [state.ema_fast, state.ema_slow]
+    if config.get('include_rsi'):
+        used += [state.rsi_gain, state.rsi_loss]
+    if config.get('include_macd'):
+        used += [state.macd_fast, state.macd_slow, state.macd_signal]
+    if any(math.isnan(v) for v in used):
+        return None
+    return state
+
+def advance_indicator_state(state: IndicatorState, open_time: int, close: float, config: Dict[str, Any]) -> IndicatorState:
+    """Fold one newly closed bar into the state."""
+    nxt = _state_step(state, close, config)
+    nxt.open_time = open_time
+    return nxt
+
+def indicators_from_state(state: IndicatorState, bars: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
+    """Indicator columns for `bars` = [last closed bar, forming bar], as compute_indicators would give.
+
+    Enough for generate_signals and build_report, which only look at the last two rows.
+    """
+    current = _state_step(state, float(bars['close'].iloc[-1]), config)
+    rows = [_state_row(state, config), _state_row(current, config)]
+    cols = {k: [rows[0][k], rows[1][k]] for k in rows[0]}
+    return bars.assign(**cols)
 
 def generate_signals(df: pd.DataFrame, config: Dict[str, Any]) -> Dict[str, Any]:
     signals = {}
@@ -1,17 +1,16 @@
-import os
-import yaml
 import logging
 import argparse
 from dotenv import load_dotenv
+from src.config import load_yaml
 from src.scheduler import MarketReporter
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(name)s: %(message)s')
 
 def load_config(path: str = 'config.yaml'):
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Config file {path} not found. Create it from config.example.yaml")
-    with open(path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    try:
+        return load_yaml(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Config file {path} not found. Create it from config.example.yaml") from None
 
 def main():
     load_dotenv()
@@ -1,91 +1,169 @@
 import time
 import logging
 import math
+import heapq
 import argparse
-from typing import List, Dict
+import threading
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, List, Dict, Tuple
 # from binance.spot import Spot  # replaced by resilient fetcher usage
-import pandas as pd
+import numpy as np
 
-from src.fetcher import BinanceFetcher
-from src.indicators import compute_weekly_ab
+from src.config import load_yaml
+from src.fetcher import BinanceFetcher, get_fetcher
+from src.indicators import compute_weekly_ab_batch, weekly_ab_limit
 from src.telegram_bot import TelegramBot
 from dotenv import load_dotenv
-import yaml
-import os
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(name)s: %(message)s')
 logger = logging.getLogger(__name__)
 
 
 def load_config(path: str = 'config.yaml') -> Dict:
-    if os.path.exists(path):
-        with open(path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
-    return {}
+    try:
+        return load_yaml(path)
+    except FileNotFoundError:
+        return {}
+
+
+# Leveraged tokens (e.g. BTCUPUSDT, ETH3LUSDT) are excluded from scans
+LEVERAGED_MARKERS = ('UP', 'DOWN', '3L', '3S', 'BULL', 'BEAR')
+
+
+def _is_leveraged(symbol: str, usdt_symbols) -> bool:
+    """<BASE><marker>USDT where <BASE>USDT is itself listed; a bare suffix test would also
+    drop real pairs such as JUPUSDT or SYRUPUSDT."""
+    pair = symbol[:-4]
+    for marker in LEVERAGED_MARKERS:
+        if pair.endswith(marker) and len(pair) > len(marker) and pair[:-len(marker)] + 'USDT' in usdt_symbols:
+            return True
+    return False
+
+
+# The top-N universe changes slowly; scheduled runs reuse it for this many seconds
+TOP_SYMBOLS_TTL = 600
+_top_symbols_cache: Dict[int, Tuple[float, List[str]]] = {}
+
+
+def _quote_volume(ticker: Dict) -> float:
+    try:
+        return float(ticker.get('quoteVolume', 0.0))
+    except (TypeError, ValueError):
+        return 0.0
 
 
 def list_top_usdt_symbols(fetcher: BinanceFetcher, top_n: int = 50) -> List[str]:
+    cached = _top_symbols_cache.get(top_n)
+    if cached is not None and time.monotonic() - cached[0] < TOP_SYMBOLS_TTL:
+        return list(cached[1])
     tickers = fetcher.fetch_ticker_24hr() or []  # may be None -> []
     if not tickers:
         raise RuntimeError('Không lấy được danh sách 24h tickers từ Binance (client+HTTP).')
-    pairs = []
-    for t in tickers:
-        sym = t.get('symbol')
-        if not sym or not sym.endswith('USDT'):
-            continue
-        # exclude leveraged tokens
-        if any(x in sym for x in ['UP', 'DOWN', '3L', '3S']):
-            continue
-        try:
-            qv = float(t.get('quoteVolume', 0.0))
-        except ValueError:
-            qv = 0.0
-        pairs.append((sym, qv))
-    pairs.sort(key=lambda x: x[1], reverse=True)
-    return [p[0] for p in pairs[:top_n]]
+    usdt = {t['symbol']: t for t in tickers if (t.get('symbol') or '').endswith('USDT')}
+    pairs = [(sym, _quote_volume(t)) for sym, t in usdt.items() if not _is_leveraged(sym, usdt)]
+    symbols = [p[0] for p in heapq.nlargest(top_n, pairs, key=itemgetter(1))]
+    _top_symbols_cache[top_n] = (time.monotonic(), symbols)
+    return list(symbols)
 
 
 def daily_volume_stats(fetcher: BinanceFetcher, symbol: str, ma_len: int = 20) -> Dict[str, float]:
     raw = fetcher.get_klines(symbol, '1d', limit=max(ma_len + 2, 30))
-    df = fetcher.to_dataframe(raw)
-    if df.empty or df['volume'].notna().sum() < ma_len + 1:
+    volume = fetcher.raw_to_ohlcv_arrays(raw)[4]
+    if np.count_nonzero(~np.isnan(volume)) < ma_len + 1:
         return {"latest": math.nan, "ma": math.nan}
-    vol_ma = df['volume'].rolling(ma_len).mean().iloc[-1]
-    vol_latest = df['volume'].iloc[-1]
+    # MA over the last `ma_len` bars (including the latest), as rolling(ma_len).mean().iloc[-1]
+    vol_ma = volume[-ma_len:].mean()
+    vol_latest = volume[-1]
     return {"latest": float(vol_latest), "ma": float(vol_ma)}
 
 
-def scan(fetcher: BinanceFetcher, top_n: int, abw_lt: float, vol_ma_len: int, vol_mult: float, weekly_len: int, weekly_mult: float, sleep_s: float):
+class _Throttle:
+    """Space out calls across worker threads by at least `interval` seconds."""
+
+    def __init__(self, interval: float):
+        self.interval = max(0.0, interval)
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _map_concurrently(func: Callable[[str], Any], symbols: List[str], max_workers: int) -> Dict[str, Any]:
+    """Run func(sym) for each symbol on a thread pool; failed symbols are logged and left out."""
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(func, sym): sym for sym in symbols}
+        for fut in as_completed(futures):
+            sym = futures[fut]
+            try:
+                results[sym] = fut.result()
+            except Exception as e:
+                logger.exception("Error scanning %s: %s", sym, e)
+    return results
+
+
+def scan(fetcher: BinanceFetcher, top_n: int, abw_lt: float, vol_ma_len: int, vol_mult: float, weekly_len: int, weekly_mult: float, sleep_s: float, max_workers: int = 8):
     symbols = list_top_usdt_symbols(fetcher, top_n=top_n)
     logger.info("Scanning %d symbols: %s", len(symbols), ', '.join(symbols[:10]) + ('...' if len(symbols) > 10 else ''))
 
+    # Requests run concurrently (the work is network-bound); the shared throttle keeps
+    # the overall rate at most one request per `sleep_s` across all workers.
+    throttle = _Throttle(sleep_s)
+
+    def _fetch_weekly(sym: str):
+        throttle.wait()
+        return fetcher.get_klines(sym, '1w', limit=weekly_ab_limit(weekly_len))
+
+    def _fetch_volume(sym: str) -> Dict[str, float]:
+        throttle.wait()
+        return daily_volume_stats(fetcher, sym, vol_ma_len)
+
+    # 1) AB_W for all symbols at once from the prefetched weekly klines
+    weekly_raw = _map_concurrently(_fetch_weekly, symbols, max_workers)
+    ab_by_symbol = compute_weekly_ab_batch(fetcher, weekly_raw, weekly_len, weekly_mult)
+    candidates = []
+    for sym in symbols:
+        ab_w = ab_by_symbol.get(sym, math.nan)
+        if ab_w < abw_lt:
+            candidates.append(sym)
+        else:
+            logger.debug("No match: %s | AB_W=%.2f", sym, ab_w)
+
+    # 2) Daily volume only matters for AB_W candidates
+    vols_by_symbol = _map_concurrently(_fetch_volume, candidates, max_workers)
     matches = []
-    for i, sym in enumerate(symbols, 1):
-        try:
-            ab_w = compute_weekly_ab(fetcher, sym, '1w', weekly_len, weekly_mult, limit=60)
-            vols = daily_volume_stats(fetcher, sym, vol_ma_len)
-            latest, ma = vols['latest'], vols['ma']
-            if not (math.isnan(ab_w) or math.isnan(latest) or math.isnan(ma)):
-                cond = (ab_w < abw_lt) and (latest > vol_mult * ma)
-                if cond:
-                    logger.info("MATCH: %s | AB_W=%.2f < %.2f | Vol=%.0f > %.1fx MA%d=%.0f", sym, ab_w, abw_lt, latest, vol_mult, vol_ma_len, ma)
-                    matches.append({"symbol": sym, "ab_w": ab_w, "vol": latest, "vol_ma": ma})
-                else:
-                    logger.debug("No match: %s | AB_W=%.2f, Vol=%.0f, MA=%0.f", sym, ab_w, latest, ma)
-        except Exception as e:
-            logger.exception("Error scanning %s: %s", sym, e)
-        time.sleep(sleep_s)
+    for sym in candidates:
+        if sym not in vols_by_symbol:
+            continue
+        ab_w = ab_by_symbol[sym]
+        latest, ma = vols_by_symbol[sym]['latest'], vols_by_symbol[sym]['ma']
+        if math.isnan(latest) or math.isnan(ma):
+            continue
+        if latest > vol_mult * ma:
+            logger.info("MATCH: %s | AB_W=%.2f < %.2f | Vol=%.0f > %.1fx MA%d=%.0f", sym, ab_w, abw_lt, latest, vol_mult, vol_ma_len, ma)
+            matches.append({"symbol": sym, "ab_w": ab_w, "vol": latest, "vol_ma": ma})
+        else:
+            logger.debug("No match: %s | AB_W=%.2f, Vol=%.0f, MA=%0.f", sym, ab_w, latest, ma)
+    matches.sort(key=lambda m: m['ab_w'])
     return matches
 
 
 def format_matches_markdown(matches: List[Dict], top_n: int, abw_lt: float, vol_ma_len: int, vol_mult: float) -> str:
+    """Format scan() results (already sorted by AB_W) for Telegram Markdown."""
     abw_label = "AB\\_W"  # escape underscore for Telegram Markdown
     if not matches:
         return (f"Kết quả quét {abw_label} + Volume\n"
                 f"Không có mã nào thỏa điều kiện ({abw_label} < {abw_lt}, Volume > {vol_mult}x MA{vol_ma_len})\n"
                 f"Top {top_n} cặp USDT.")
-    # Sort
-    matches = sorted(matches, key=lambda x: x['ab_w'])
     lines = [
         f"Kết quả quét {abw_label} + Volume",
         f"Điều kiện: {abw_label} < {abw_lt}, Vol > {vol_mult}x MA{vol_ma_len}",
@@ -113,7 +191,8 @@ def main():
     parser.add_argument('--vol-mult', type=float, default=10.0, help='Volume multiplier over MA to trigger')
     parser.add_argument('--bb-len', type=int, default=20, help='Bollinger length (weekly)')
     parser.add_argument('--bb-mult', type=float, default=2.0, help='Bollinger multiplier (weekly)')
-    parser.add_argument('--sleep', type=float, default=0.1, help='Sleep between symbols to respect rate limit')
+    parser.add_argument('--sleep', type=float, default=0.1, help='Minimum spacing between symbols (shared by all workers) to respect rate limit')
+    parser.add_argument('--workers', type=int, default=8, help='Number of symbols scanned concurrently')
     parser.add_argument('--verbose', action='store_true', help='Show per-symbol diagnostics (AB_W, volume, MA)')
     parser.add_argument('--to-telegram', action='store_true', help='Gửi kết quả (hoặc thông báo không có mã) lên Telegram')
     parser.add_argument('--dry-run-telegram', action='store_true', help='Không gửi thật, chỉ in nội dung sẽ gửi')
@@ -134,7 +213,7 @@ def main():
     weekly_mult = float(cs.get('bb_mult', args.bb_mult))
 
     try:
-        fetcher = BinanceFetcher([], '1d')
+        fetcher = get_fetcher()
         matches = scan(
             fetcher=fetcher,
             top_n=args.top,
@@ -144,6 +223,7 @@ def main():
             weekly_len=weekly_len,
             weekly_mult=weekly_mult,
             sleep_s=args.sleep,
+            max_workers=args.workers,
         )
     except Exception as e:
         logger.exception("Scan failed: %s", e)
@@ -158,9 +238,11 @@ def main():
     if not matches:
         logger.info("No matches found with current thresholds.")
     else:
-        df = pd.DataFrame(matches).sort_values(by=['ab_w'])
+        # scan() returns matches already sorted by AB_W
         print("\nMatches (sorted by AB_W):")
-        print(df.to_string(index=False))
+        print(f"{'symbol':>12} {'ab_w':>8} {'vol':>16} {'vol_ma':>16}")
+        for m in matches:
+            print(f"{m['symbol']:>12} {m['ab_w']:>8.4f} {m['vol']:>16.2f} {m['vol_ma']:>16.2f}")
 
     if args.to_telegram:
         text = format_matches_markdown(matches, args.top, abw_lt, vol_ma_len, vol_mult)
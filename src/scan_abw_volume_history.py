@@ -1,114 +1,151 @@
 import logging
 import argparse
 import math
-import os
-import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List
+from typing import Dict, List, Tuple
+import numpy as np
 import pandas as pd
-from binance.spot import Spot
 
-from src.fetcher import BinanceFetcher
-from src.indicators import compute_weekly_ab
+from src import _kernels
+from src.config import load_yaml
+from src.fetcher import BinanceFetcher, get_fetcher
+from src.scan_abw_volume import list_top_usdt_symbols
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(name)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+HIT_COLUMNS = ['symbol', 'date', 'ab_w', 'volume', 'vol_ma']
+
+
+def _empty_hits() -> pd.DataFrame:
+    return pd.DataFrame(columns=HIT_COLUMNS)
+
 
 def load_config(path: str = 'config.yaml') -> Dict:
-    if os.path.exists(path):
-        with open(path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
-    return {}
-
-
-def list_top_usdt_symbols(client: Spot, top_n: int = 50) -> List[str]:
-    tickers = client.ticker_24hr()
-    pairs = []
-    for t in tickers:
-        sym = t.get('symbol')
-        if not sym or not sym.endswith('USDT'):
+    try:
+        return load_yaml(path)
+    except FileNotFoundError:
+        return {}
+
+
+def _prev_window_mean(values: np.ndarray, n: int) -> np.ndarray:
+    """Mean of the `n` values before each position along the last axis, i.e. rolling(n).mean().shift(1), via cumsum.
+
+    Windows containing a NaN give NaN, as with pandas.
+    """
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] > n:
+        valid = ~np.isnan(values)
+        pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+        csum = np.pad(np.cumsum(np.where(valid, values, 0.0), axis=-1), pad)
+        ccount = np.pad(np.cumsum(valid, axis=-1), pad)
+        total = csum[..., n:-1] - csum[..., :-n - 1]
+        count = ccount[..., n:-1] - ccount[..., :-n - 1]
+        out[..., n:] = np.where(count == n, total / n, np.nan)
+    return out
+
+
+def _open_times(raw: list) -> np.ndarray:
+    return np.fromiter((k[0] for k in raw), dtype=np.int64, count=len(raw))
+
+
+def _stack_right(rows: List[np.ndarray], fill, dtype=np.float64) -> np.ndarray:
+    """Stack 1-D arrays into (len(rows), longest) with each row right-aligned, left-padded with `fill`."""
+    width = max((len(r) for r in rows), default=0)
+    out = np.full((len(rows), width), fill, dtype=dtype)
+    for i, r in enumerate(rows):
+        out[i, width - len(r):] = r
+    return out
+
+
+def _fetch_symbol_klines(fetcher: BinanceFetcher, symbol: str, days: int, weekly_len: int) -> Tuple[list, list]:
+    # Extra daily bars cover early gaps and the volume MA window; weekly ones the AB window
+    return fetcher.get_klines(symbol, '1d', limit=days + 40), fetcher.get_klines(symbol, '1w', limit=weekly_len + 80)
+
+
+def find_signals_batch(fetcher: BinanceFetcher, symbols: List[str], daily_raws: List[list], weekly_raws: List[list], days: int, abw_lt: float, vol_ma_len: int, vol_mult: float, weekly_len: int, weekly_mult: float) -> pd.DataFrame:
+    """Days over the last `days` where AB_W < abw_lt and volume > vol_mult x MA of the previous vol_ma_len days.
+
+    `daily_raws` / `weekly_raws` are the symbols' raw 1d / 1w klines (oldest first). Every
+    symbol is evaluated on its own bars: rows are right-aligned (latest bar in the last column)
+    and NaN-padded on the left, so windows never straddle another symbol's calendar, and the
+    rolling math runs once for all symbols. Hits are ordered by date, then by `symbols` order.
+    """
+    if not symbols:
+        return _empty_hits()
+    # Last N+5 daily bars per symbol so the first evaluated days already have an MA
+    daily_raws = [raw[-(days + 5):] for raw in daily_raws]
+    day_t = _stack_right([_open_times(raw) for raw in daily_raws], -1, np.int64)
+    volume = _stack_right([fetcher.raw_to_ohlcv_arrays(raw)[4] for raw in daily_raws], np.nan)
+    weekly = [fetcher.raw_to_ohlcv_arrays(raw) for raw in weekly_raws]
+    high, low, close = (_stack_right([w[i] for w in weekly], np.nan) for i in (1, 2, 3))
+
+    # AB_W per week, shifted one week to avoid lookahead (a completed week applies to the following days)
+    ab_shifted = np.full(high.shape, np.nan)
+    if high.shape[1]:
+        ab_shifted[:, 1:] = _kernels.ab(high, low, close, weekly_len, weekly_mult)[:, :-1]
+    # Forward-fill onto each symbol's days from its own weeks: last week opened at or before the day
+    ab_w = np.full(volume.shape, np.nan)
+    for row, raw in enumerate(weekly_raws):
+        n_days = len(daily_raws[row])
+        if not raw or not n_days:
             continue
-        if any(x in sym for x in ['UP', 'DOWN', '3L', '3S']):
-            continue
-        try:
-            qv = float(t.get('quoteVolume', 0.0))
-        except ValueError:
-            qv = 0.0
-        pairs.append((sym, qv))
-    pairs.sort(key=lambda x: x[1], reverse=True)
-    return [p[0] for p in pairs[:top_n]]
-
-
-def get_daily_df(fetcher: BinanceFetcher, symbol: str, days: int) -> pd.DataFrame:
-    # Fetch slightly more candles than needed (days + buffer) due to missing early bars and MA windows
-    raw = fetcher.get_klines(symbol, '1d', limit=days + 40)
-    df = fetcher.to_dataframe(raw)
-    return df.tail(days + 5)  # keep last N+5 to ensure moving averages are valid
-
-
-def prepare_weekly_ab(fetcher: BinanceFetcher, symbol: str, weekly_len: int, weekly_mult: float) -> pd.Series:
-    raw = fetcher.get_klines(symbol, '1w', limit=weekly_len + 80)
-    wdf = fetcher.to_dataframe(raw)
-    if wdf.empty:
-        return pd.Series(dtype=float)
-    # Compute AB_W series over weekly dataframe
-    from src.indicators import compute_ab
-    ab_series = compute_ab(wdf, weekly_len, weekly_mult)
-    # Shift one to avoid lookahead (use completed week value for following days)
-    ab_series_shifted = ab_series.shift(1)
-    ab_series_shifted.name = 'ab_w'
-    # Map weekly to daily index by forward filling to next weekly close
-    return ab_series_shifted
-
-
-def map_weekly_to_daily(daily_index: pd.DatetimeIndex, weekly_series: pd.Series) -> pd.Series:
-    # Reindex with forward fill
-    return weekly_series.reindex(daily_index, method='ffill')
+        idx = np.searchsorted(_open_times(raw), day_t[row, -n_days:], side='right') - 1
+        has_week = idx >= 0
+        day_cols = volume.shape[1] - n_days + np.flatnonzero(has_week)
+        ab_w[row, day_cols] = ab_shifted[row, high.shape[1] - len(raw) + idx[has_week]]
 
+    # Volume MA (exclude current day for spike check by shifting MA)
+    vol_ma = _prev_window_mean(volume, vol_ma_len)
+
+    rows, cols = np.nonzero((ab_w < abw_lt) & (volume > vol_mult * vol_ma))
+    if rows.size == 0:
+        return _empty_hits()
+    for sym, n in zip(symbols, np.bincount(rows, minlength=len(symbols))):
+        if n:
+            logger.info("%s: %d hits", sym, n)
+    # nonzero() is symbol-major; a stable sort of the hits alone gives date order, symbols ranked within a day
+    order = np.argsort(day_t[rows, cols], kind='stable')
+    rows, cols = rows[order], cols[order]
+    dates = pd.DatetimeIndex(pd.to_datetime(day_t[rows, cols], unit='ms', utc=True), name='open_time')
+    return pd.DataFrame(
+        {'symbol': np.asarray(symbols, dtype=object)[rows], 'date': dates, 'ab_w': ab_w[rows, cols], 'volume': volume[rows, cols], 'vol_ma': vol_ma[rows, cols]},
+        index=dates,
+    )
 
-def find_signals_for_symbol(fetcher: BinanceFetcher, symbol: str, days: int, abw_lt: float, vol_ma_len: int, vol_mult: float, weekly_len: int, weekly_mult: float) -> pd.DataFrame:
-    daily_df = get_daily_df(fetcher, symbol, days)
-    if daily_df.empty:
-        return pd.DataFrame(columns=['symbol','date','ab_w','volume','vol_ma'])
 
-    # Prepare weekly AB_W shifted (no lookahead)
-    weekly_ab = prepare_weekly_ab(fetcher, symbol, weekly_len, weekly_mult)
-    ab_w_daily = map_weekly_to_daily(daily_df.index, weekly_ab)
-    daily_df['ab_w'] = ab_w_daily
+def find_signals_for_symbol(fetcher: BinanceFetcher, symbol: str, days: int, abw_lt: float, vol_ma_len: int, vol_mult: float, weekly_len: int, weekly_mult: float) -> pd.DataFrame:
+    daily_raw, weekly_raw = _fetch_symbol_klines(fetcher, symbol, days, weekly_len)
+    return find_signals_batch(fetcher, [symbol], [daily_raw], [weekly_raw], days, abw_lt, vol_ma_len, vol_mult, weekly_len, weekly_mult)
 
-    # Volume MA (exclude current day for spike check by shifting MA)
-    daily_df['vol_ma'] = daily_df['volume'].rolling(vol_ma_len).mean().shift(1)
 
-    cond = (
-        (daily_df['ab_w'] < abw_lt) &
-        (daily_df['volume'] > vol_mult * daily_df['vol_ma'])
-    )
-    hits = daily_df[cond].copy()
-    if hits.empty:
-        return pd.DataFrame(columns=['symbol','date','ab_w','volume','vol_ma'])
-    hits['symbol'] = symbol
-    hits['date'] = hits.index
-    return hits[['symbol','date','ab_w','volume','vol_ma']]
-
-
-def scan_history(top_n: int, days: int, abw_lt: float, vol_ma_len: int, vol_mult: float, weekly_len: int, weekly_mult: float) -> pd.DataFrame:
-    client = Spot()
-    fetcher = BinanceFetcher([], '1d')
-    symbols = list_top_usdt_symbols(client, top_n=top_n)
+def scan_history(top_n: int, days: int, abw_lt: float, vol_ma_len: int, vol_mult: float, weekly_len: int, weekly_mult: float, max_workers: int = 8) -> pd.DataFrame:
+    fetcher = get_fetcher()
+    symbols = list_top_usdt_symbols(fetcher, top_n=top_n)
     logger.info("Historical scan %d days for %d symbols...", days, len(symbols))
-    all_hits = []
-    for sym in symbols:
-        try:
-            hits = find_signals_for_symbol(fetcher, sym, days, abw_lt, vol_ma_len, vol_mult, weekly_len, weekly_mult)
-            if not hits.empty:
-                logger.info("%s: %d hits", sym, len(hits))
-                all_hits.append(hits)
-        except Exception as e:
-            logger.exception("Error processing %s: %s", sym, e)
-    if not all_hits:
-        return pd.DataFrame(columns=['symbol','date','ab_w','volume','vol_ma'])
-    return pd.concat(all_hits).sort_values(by='date')
+    # Symbols are independent and the fetches are network-bound: run them concurrently,
+    # then evaluate every symbol at once on the stacked arrays
+    klines = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(_fetch_symbol_klines, fetcher, sym, days, weekly_len): sym
+            for sym in symbols
+        }
+        for fut in as_completed(futures):
+            sym = futures[fut]
+            try:
+                daily_raw, weekly_raw = fut.result()
+            except Exception as e:
+                logger.exception("Error processing %s: %s", sym, e)
+                continue
+            if daily_raw:
+                klines[sym] = (daily_raw, weekly_raw)
+    batch = [sym for sym in symbols if sym in klines]
+    return find_signals_batch(
+        fetcher, batch, [klines[sym][0] for sym in batch], [klines[sym][1] for sym in batch],
+        days, abw_lt, vol_ma_len, vol_mult, weekly_len, weekly_mult,
+    )
 
 
 def main():
@@ -120,6 +157,7 @@ def main():
     parser.add_argument('--vol-mult', type=float, default=5.0, help='Volume multiplier over MA')
     parser.add_argument('--bb-len', type=int, default=20, help='Weekly Bollinger length')
     parser.add_argument('--bb-mult', type=float, default=2.0, help='Weekly Bollinger multiplier')
+    parser.add_argument('--workers', type=int, default=8, help='Number of symbols fetched concurrently')
     parser.add_argument('--out-csv', type=str, default='', help='Save hits to CSV file path')
     args = parser.parse_args()
 
@@ -138,7 +176,8 @@ def main():
         vol_ma_len=vol_ma_len,
         vol_mult=vol_mult,
         weekly_len=weekly_len,
-        weekly_mult=weekly_mult
+        weekly_mult=weekly_mult,
+        max_workers=args.workers,
     )
 
     if result.empty:
@@ -1,11 +1,11 @@
-import os
 import logging
 import argparse
 from apscheduler.schedulers.blocking import BlockingScheduler
 from dotenv import load_dotenv
-import yaml
 from typing import Dict
 
+from src.config import load_yaml
+from src.fetcher import get_fetcher
 from src.scan_abw_volume import scan, format_matches_markdown
 from src.telegram_bot import TelegramBot
 
@@ -14,10 +14,10 @@ logger = logging.getLogger(__name__)
 
 
 def load_config(path: str = 'config.yaml') -> Dict:
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Config file {path} not found. Create it from config.example.yaml")
-    with open(path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    try:
+        return load_yaml(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Config file {path} not found. Create it from config.example.yaml") from None
 
 
 def run_scan_job(cfg: Dict, dry_run: bool = False):
@@ -29,8 +29,10 @@ def run_scan_job(cfg: Dict, dry_run: bool = False):
     weekly_mult = float(cs.get('bb_mult', 2.0))
     top_n = int((cfg.get('binance') or {}).get('top_n_scan', 50))
     sleep_s = float((cfg.get('binance') or {}).get('scan_sleep', 0.1))
+    max_workers = int((cfg.get('binance') or {}).get('scan_workers', 8))
 
     matches = scan(
+        fetcher=get_fetcher(),
         top_n=top_n,
         abw_lt=abw_lt,
         vol_ma_len=vol_ma_len,
@@ -38,6 +40,7 @@ def run_scan_job(cfg: Dict, dry_run: bool = False):
         weekly_len=weekly_len,
         weekly_mult=weekly_mult,
         sleep_s=sleep_s,
+        max_workers=max_workers,
     )
     text = format_matches_markdown(matches, top_n, abw_lt, vol_ma_len, vol_mult)
     if dry_run:
@@ -45,8 +48,8 @@ def run_scan_job(cfg: Dict, dry_run: bool = False):
         print(text)
     else:
         tg_cfg = (cfg.get('telegram') or {})
-        bot = TelegramBot(tg_cfg.get('bot_token'), tg_cfg.get('chat_id'), tg_cfg.get('parse_mode','Markdown'))
-        bot.send_message(text)
+        with TelegramBot(tg_cfg.get('bot_token'), tg_cfg.get('chat_id'), tg_cfg.get('parse_mode','Markdown')) as bot:
+            bot.send_message(text)
         logger.info("Đã gửi kết quả quét hằng ngày lên Telegram.")
 
 
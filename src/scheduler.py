@@ -1,10 +1,15 @@
 import logging
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timezone
-import time
-from typing import Dict, Any
-from .fetcher import BinanceFetcher
-from .indicators import compute_indicators, generate_signals, compute_ab, compute_weekly_ab
+import os
+import signal
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterator, Optional, Tuple
+from .fetcher import get_fetcher
+from .indicators import (compute_indicators, generate_signals, compute_ab, compute_weekly_ab,
+                         IndicatorState, seed_indicator_state, advance_indicator_state, indicators_from_state)
 import pandas as pd
 from .report import build_report
 from .telegram_bot import TelegramBot
@@ -14,82 +19,183 @@ logger = logging.getLogger(__name__)
 class MarketReporter:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
-        self.fetcher = BinanceFetcher(config['binance']['symbols'], config['binance']['interval'])
+        self.fetcher = get_fetcher(config['binance']['symbols'], config['binance']['interval'])
         self.bot = TelegramBot(config['telegram'].get('bot_token'), config['telegram'].get('chat_id'), config['telegram'].get('parse_mode','Markdown'))
         self.scheduler = BackgroundScheduler(timezone=timezone.utc)
         testing = config.get('testing', {})
         self.quick_mode = bool(testing.get('quick_mode', False))
         self.fetch_limit = int(testing.get('fetch_limit', 300))
+        # Per-symbol indicator state for incremental updates in check_signals
+        self._states: Dict[str, IndicatorState] = {}
+        self._stop = threading.Event()
+        # Symbols are independent and I/O-bound: both jobs fan out over this pool
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(config['binance'].get('scan_workers', 8))), thread_name_prefix='reporter')
+        # Per-symbol closed daily volumes for the custom signal's volume MA: the last
+        # vol_ma_len-1 values, their running sum and the open time of the newest one
+        self._vol_buffers: Dict[str, deque] = {}
+        self._vol_sums: Dict[str, float] = {}
+        self._vol_open: Dict[str, int] = {}
 
-    def _prepare_df(self, symbol: str):
-        raw = self.fetcher.get_klines(symbol, self.config['binance']['interval'], limit=self.fetch_limit)
-        df = self.fetcher.to_dataframe(raw)
+    def _indicator_config(self) -> Dict[str, Any]:
         # Merge indicator toggles (report) with parameters (indicators)
         merged = {**self.config['report'], **self.config['indicators']}
         if self.quick_mode:
             # Skip MACD in quick mode to accelerate
             merged['include_macd'] = False
-        df_ind = compute_indicators(df, merged)
+        return merged
+
+    def _check_interval(self) -> int:
+        """Seconds between check_signals runs."""
+        interval = self.config['scheduler']['check_interval_seconds']
+        if self.quick_mode and interval > 15:
+            # speed up checks in quick mode but keep safe lower bound
+            interval = 15
+        return interval
+
+    def _tick_max_age(self) -> float:
+        """Oldest cached klines check_signals accepts: half a tick, so every tick refetches the
+        forming bar (the fetcher's default 1d lifetime would delay alerts by up to 24 minutes)."""
+        return self._check_interval() / 2
+
+    def _prepare_df(self, symbol: str):
+        raw = self.fetcher.get_klines(symbol, self.config['binance']['interval'], limit=self.fetch_limit)
+        df = self.fetcher.to_dataframe(raw)
+        df_ind = compute_indicators(df, self._indicator_config())
         return df_ind
 
+    def _prepare_latest_df(self, symbol: str):
+        """Last closed + forming bar with indicators, updated from the cached state when possible.
+
+        Falls back to a full fetch/compute on cold start or when bars were missed.
+        """
+        interval = self.config['binance']['interval']
+        merged = self._indicator_config()
+        state = self._states.get(symbol)
+        if state is not None:
+            # [bar the state may end on, last closed bar, forming bar]
+            raw = self.fetcher.get_klines(symbol, interval, limit=3, max_age=self._tick_max_age())
+            if len(raw) == 3 and raw[1][0] == state.open_time:
+                return indicators_from_state(state, self.fetcher.to_dataframe(raw[1:]), merged)
+            if len(raw) == 3 and raw[0][0] == state.open_time:
+                state = advance_indicator_state(state, raw[1][0], float(raw[1][4]), merged)
+                self._states[symbol] = state
+                return indicators_from_state(state, self.fetcher.to_dataframe(raw[1:]), merged)
+            logger.info("Indicator state for %s is out of date; recomputing from full history", symbol)
+        raw = self.fetcher.get_klines(symbol, interval, limit=self.fetch_limit, max_age=self._tick_max_age())
+        df = self.fetcher.to_dataframe(raw)
+        state = seed_indicator_state(df.iloc[:-1], raw[-2][0], merged) if len(raw) >= 2 else None
+        if state is None:
+            self._states.pop(symbol, None)
+            return compute_indicators(df, merged)
+        self._states[symbol] = state
+        return indicators_from_state(state, df.iloc[-2:], merged)
+
+    def _daily_volume(self, symbol: str, interval: str, ma_len: int) -> Tuple[float, float]:
+        """Latest (forming) daily volume and its MA over ma_len bars including it.
+
+        Closed volumes are kept in a running window, so a tick only fetches the last few bars;
+        the window is reseeded on cold start or when a day was missed. Returns NaNs when the
+        history is too short.
+        """
+        buf = self._vol_buffers.get(symbol)
+        if buf is not None and buf.maxlen == ma_len - 1:
+            # [bar the window may end on, last closed bar, forming bar]
+            raw = self.fetcher.get_klines(symbol, interval, limit=3, max_age=self._tick_max_age())
+            if len(raw) == 3 and raw[0][0] == self._vol_open[symbol]:
+                v = float(raw[1][5])
+                if buf.maxlen:
+                    if len(buf) == buf.maxlen:
+                        self._vol_sums[symbol] -= buf[0]
+                    buf.append(v)
+                    self._vol_sums[symbol] += v
+                self._vol_open[symbol] = raw[1][0]
+            if len(raw) == 3 and raw[1][0] == self._vol_open[symbol]:
+                latest = float(raw[2][5])
+                return latest, (self._vol_sums[symbol] + latest) / ma_len
+        raw = self.fetcher.get_klines(symbol, interval, limit=max(ma_len + 2, 25), max_age=self._tick_max_age())
+        if len(raw) < ma_len + 1:
+            for d in (self._vol_buffers, self._vol_sums, self._vol_open):
+                d.pop(symbol, None)
+            return float('nan'), float('nan')
+        closed = raw[len(raw) - ma_len:-1]
+        buf = deque((float(k[5]) for k in closed), maxlen=ma_len - 1)
+        self._vol_buffers[symbol] = buf
+        self._vol_sums[symbol] = sum(buf)
+        self._vol_open[symbol] = raw[-2][0]
+        latest = float(raw[-1][5])
+        return latest, (self._vol_sums[symbol] + latest) / ma_len
+
+    def _map_symbols(self, func: Callable[[str], Any]) -> Iterator[Any]:
+        """Apply func to every configured symbol on the worker pool, yielding results in symbol order."""
+        return self._pool.map(func, self.config['binance']['symbols'])
+
+    def _report_text(self, symbol: str) -> str:
+        df = self._prepare_df(symbol)
+        signals = generate_signals(df, self.config['indicators'])
+        # Include AB and AB_W values (if configured)
+        custom_cfg = self.config.get('custom_signals', {}).get('abw_volume_spike', {})
+        if custom_cfg.get('enabled'):
+            try:
+                ab_series = compute_ab(df, int(custom_cfg.get('bb_length', 20)), float(custom_cfg.get('bb_mult', 2.0)))
+                ab_valid = ab_series.dropna()
+                ab_latest = float(ab_valid.iloc[-1]) if not ab_valid.empty else float('nan')
+                ab_w = compute_weekly_ab(
+                    self.fetcher,
+                    symbol,
+                    custom_cfg.get('weekly_interval', '1w'),
+                    int(custom_cfg.get('bb_length', 20)),
+                    float(custom_cfg.get('bb_mult', 2.0))
+                )
+                signals['ab_values'] = f"AB={ab_latest:.2f}, AB_W={ab_w:.2f}"
+            except Exception as e:
+                logger.exception("Error computing AB/AB_W values for %s: %s", symbol, e)
+        return build_report(symbol, df, signals, self.config['report']['decimals'])
+
     def periodic_report(self):
-        for symbol in self.config['binance']['symbols']:
-            df = self._prepare_df(symbol)
-            signals = generate_signals(df, self.config['indicators'])
-            # Include AB and AB_W values (if configured)
-            custom_cfg = self.config.get('custom_signals', {}).get('abw_volume_spike', {})
-            if custom_cfg.get('enabled'):
-                try:
-                    ab_series = compute_ab(df, int(custom_cfg.get('bb_length', 20)), float(custom_cfg.get('bb_mult', 2.0)))
-                    ab_latest = float(ab_series.dropna().iloc[-1]) if not ab_series.dropna().empty else float('nan')
-                    ab_w = compute_weekly_ab(
-                        self.fetcher,
-                        symbol,
-                        custom_cfg.get('weekly_interval', '1w'),
-                        int(custom_cfg.get('bb_length', 20)),
-                        float(custom_cfg.get('bb_mult', 2.0)),
-                        limit=60 if self.quick_mode else 120
-                    )
-                    signals['ab_values'] = f"AB={ab_latest:.2f}, AB_W={ab_w:.2f}"
-                except Exception as e:
-                    logger.exception("Error computing AB/AB_W values for %s: %s", symbol, e)
-            text = build_report(symbol, df, signals, self.config['report']['decimals'])
+        # Symbols are fetched and computed concurrently; messages still go out in config order
+        for text in self._map_symbols(self._report_text):
             self.bot.send_message(text)
 
+    def _signal_text(self, symbol: str, standard: bool) -> Optional[str]:
+        df = self._prepare_latest_df(symbol) if standard else None
+        signals = generate_signals(df, self.config['indicators']) if standard else {}
+        # Custom: AB_W < threshold and Daily Volume spike > multiplier * MA
+        custom_cfg = self.config.get('custom_signals', {}).get('abw_volume_spike', {})
+        if custom_cfg.get('enabled'):
+            try:
+                weekly_interval = custom_cfg.get('weekly_interval', '1w')
+                daily_interval = custom_cfg.get('daily_interval', '1d')
+                bb_length = int(custom_cfg.get('bb_length', 20))
+                bb_mult = float(custom_cfg.get('bb_mult', 2.0))
+                abw_lt = float(custom_cfg.get('abw_lt', 1.0))
+                vol_ma_len = int(custom_cfg.get('volume_ma_length', 20))
+                vol_mult = float(custom_cfg.get('volume_multiplier', 10.0))
+
+                # Weekly AB
+                ab_w = compute_weekly_ab(self.fetcher, symbol, weekly_interval, bb_length, bb_mult, max_age=self._tick_max_age())
+
+                # Daily volume vs. its MA
+                vol_latest, vol_ma = self._daily_volume(symbol, daily_interval, vol_ma_len)
+                if pd.notna(vol_ma) and pd.notna(vol_latest) and pd.notna(ab_w):
+                    if (ab_w < abw_lt) and (vol_latest > vol_mult * vol_ma):
+                        signals['abw_volume_spike'] = (
+                            f"AB_W={ab_w:.2f} < {abw_lt}, Volume {vol_latest:.0f} > {vol_mult}x MA{vol_ma_len} ({vol_ma:.0f})"
+                        )
+            except Exception as e:
+                logger.exception("Error evaluating custom ABW volume spike for %s: %s", symbol, e)
+        if not signals:
+            return None
+        if df is None:
+            df = self._prepare_latest_df(symbol)
+        return build_report(symbol, df, signals, self.config['report']['decimals'])
+
     def check_signals(self):
-        for symbol in self.config['binance']['symbols']:
-            df = self._prepare_df(symbol)
-            signals = generate_signals(df, self.config['indicators'])
-            # Custom: AB_W < threshold and Daily Volume spike > multiplier * MA
-            custom_cfg = self.config.get('custom_signals', {}).get('abw_volume_spike', {})
-            if custom_cfg.get('enabled'):
-                try:
-                    weekly_interval = custom_cfg.get('weekly_interval', '1w')
-                    daily_interval = custom_cfg.get('daily_interval', '1d')
-                    bb_length = int(custom_cfg.get('bb_length', 20))
-                    bb_mult = float(custom_cfg.get('bb_mult', 2.0))
-                    abw_lt = float(custom_cfg.get('abw_lt', 1.0))
-                    vol_ma_len = int(custom_cfg.get('volume_ma_length', 20))
-                    vol_mult = float(custom_cfg.get('volume_multiplier', 10.0))
-
-                    # Weekly AB
-                    ab_w = compute_weekly_ab(self.fetcher, symbol, weekly_interval, bb_length, bb_mult, limit=60)
-
-                    # Daily volume series
-                    daily_raw = self.fetcher.get_klines(symbol, daily_interval, limit=max(vol_ma_len + 2, 25))
-                    daily_df = self.fetcher.to_dataframe(daily_raw)
-                    if not daily_df.empty and daily_df['volume'].notna().sum() >= vol_ma_len + 1:
-                        vol_ma = daily_df['volume'].rolling(vol_ma_len).mean().iloc[-1]
-                        vol_latest = daily_df['volume'].iloc[-1]
-                        if pd.notna(vol_ma) and pd.notna(vol_latest) and pd.notna(ab_w):
-                            if (ab_w < abw_lt) and (vol_latest > vol_mult * vol_ma):
-                                signals['abw_volume_spike'] = (
-                                    f"AB_W={ab_w:.2f} < {abw_lt}, Volume {vol_latest:.0f} > {vol_mult}x MA{vol_ma_len} ({vol_ma:.0f})"
-                                )
-                except Exception as e:
-                    logger.exception("Error evaluating custom ABW volume spike for %s: %s", symbol, e)
-            if signals:
-                text = build_report(symbol, df, signals, self.config['report']['decimals'])
+        merged = self._indicator_config()
+        # With every standard indicator switched off, generate_signals has nothing to find, so
+        # the interval klines + indicators are only needed to build a report for a custom hit
+        standard = any(merged.get(k) for k in ('include_rsi', 'include_ema', 'include_macd'))
+        for text in self._map_symbols(lambda symbol: self._signal_text(symbol, standard)):
+            if text:
                 self.bot.send_message(text)
 
     def start(self):
@@ -97,16 +203,25 @@ class MarketReporter:
         if len(cron) != 5:
             raise ValueError("Cron expression must have 5 fields (min hour day month weekday)")
         self.scheduler.add_job(self.periodic_report, 'cron', minute=cron[0], hour=cron[1], day=cron[2], month=cron[3], day_of_week=cron[4], id='periodic_report')
-        interval = self.config['scheduler']['check_interval_seconds']
-        if self.quick_mode and interval > 15:
-            # speed up checks in quick mode but keep safe lower bound
-            interval = 15
-        self.scheduler.add_job(self.check_signals, 'interval', seconds=interval, id='signal_check')
+        self.scheduler.add_job(self.check_signals, 'interval', seconds=self._check_interval(), id='signal_check')
         self.scheduler.start()
         logger.info("Scheduler started.")
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, getattr(signal, 'SIGTERM', None)):
+                if sig is not None:
+                    signal.signal(sig, lambda *_: self.stop())
+        # Block without polling until stop() or a signal; Windows only delivers Ctrl+C
+        # between bytecodes, so wake up once a second there to let the handler run
+        timeout = 1.0 if os.name == 'nt' else None
         try:
-            while True:
-                time.sleep(1)
+            while not self._stop.wait(timeout):
+                pass
         except KeyboardInterrupt:
-            logger.info("Stopping scheduler...")
-            self.scheduler.shutdown()
+            pass
+        logger.info("Stopping scheduler...")
+        self.scheduler.shutdown()
+        self._pool.shutdown()
+
+    def stop(self):
+        """Make start() return and shut the scheduler down (safe from signal handlers and other threads)."""
+        self._stop.set()
@@ -3,7 +3,7 @@ import argparse
 import logging
 from dotenv import load_dotenv
 
-from src.fetcher import BinanceFetcher
+from src.fetcher import get_fetcher
 from src.indicators import compute_indicators, generate_signals, compute_weekly_ab
 from src.report import build_report
 from src.telegram_bot import TelegramBot
@@ -25,7 +25,7 @@ def main():
     args = parser.parse_args()
 
     # If running in CI with restricted region, allow graceful fallback with degraded notice
-    fetcher = BinanceFetcher([args.symbol], args.interval)
+    fetcher = get_fetcher([args.symbol], args.interval)
     raw = None
     try:
         raw = fetcher.get_klines(args.symbol, args.interval, limit=args.limit)
@@ -69,7 +69,7 @@ def main():
     # Optional AB_W attach
     if args.include_abw:
         try:
-            ab_w = compute_weekly_ab(fetcher, args.symbol, '1w', 20, 2.0, limit=60)
+            ab_w = compute_weekly_ab(fetcher, args.symbol, '1w', 20, 2.0)
             # Escape underscore for Telegram Markdown
             signals['abw'] = f"AB\\_W={ab_w:.2f} (weekly, len=20, mult=2.0)"
         except Exception as e:
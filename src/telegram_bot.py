@@ -7,6 +7,14 @@ from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# A code span (an unclosed backtick runs to the end) or a bare underscore outside one
+_MD_ESC = re.compile(r'`[^`]*(?:`|\Z)|(_)')
+
+
+def _escape_markdown(md: str) -> str:
+    return _MD_ESC.sub(lambda m: m.group(0) if m.group(1) is None else '\\_', md)
+
+
 class TelegramBot:
     def __init__(self, token: Optional[str] = None, chat_id: Optional[str] = None, parse_mode: str = "Markdown", dry_run: bool = False):
         self.token = token or os.getenv('TELEGRAM_BOT_TOKEN')
@@ -15,9 +23,20 @@ class TelegramBot:
         self.dry_run = dry_run or os.getenv('TELEGRAM_DRY_RUN') == '1'
         if not self.dry_run and (not self.token or not self.chat_id):
             raise ValueError("Telegram token or chat id missing. Set in config or environment variables, or enable dry_run.")
+        # One keep-alive session so consecutive sends reuse the TLS connection to api.telegram.org
+        self.session = requests.Session()
         if not self.dry_run:
             self._preflight()
 
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     def _valid_token_format(self) -> bool:
         # Rough pattern: digits, colon, long token part
         return bool(self.token and re.match(r"^\d{6,}:[A-Za-z0-9_-]{20,}$", self.token))
@@ -31,7 +50,7 @@ class TelegramBot:
             logging.warning("Telegram token format looks unusual. Double-check you copied it correctly from @BotFather.")
         # Call getMe to verify token
         try:
-            r = requests.get(self._api_url('getMe'), timeout=10)
+            r = self.session.get(self._api_url('getMe'), timeout=10)
             if r.status_code == 200 and r.json().get('ok'):
                 me = r.json().get('result', {})
                 logging.info("Telegram bot authenticated: @%s (id=%s)", me.get('username'), me.get('id'))
@@ -42,7 +61,7 @@ class TelegramBot:
         # Optionally validate chat id
         if self.chat_id:
             try:
-                r = requests.get(self._api_url('getChat'), params={'chat_id': self.chat_id}, timeout=10)
+                r = self.session.get(self._api_url('getChat'), params={'chat_id': self.chat_id}, timeout=10)
                 if r.status_code != 200:
                     logging.warning("Telegram getChat warning: %s - %s", r.status_code, r.text)
                     logging.warning("If this is a private chat, ensure you've started the bot (click Start) to allow messages. For groups, add the bot and use the group chat_id (usually negative).")
@@ -61,7 +80,7 @@ class TelegramBot:
         attempt = 0
         while attempt <= retries:
             try:
-                r = requests.post(url, json=payload, timeout=10)
+                r = self.session.post(url, json=payload, timeout=10)
                 return r, None
             except (requests.Timeout, requests.ConnectionError) as e:
                 if attempt == retries:
@@ -78,13 +97,7 @@ class TelegramBot:
         # Basic escape for Markdown (not MarkdownV2) to avoid 'can't parse entities'
         if self.parse_mode == 'Markdown':
             # Escape underscores not inside code spans.
-            def _escape(md: str) -> str:
-                # Naive split on backticks to keep code blocks intact
-                parts = md.split('`')
-                for i in range(0, len(parts), 2):  # even indices are outside code spans
-                    parts[i] = parts[i].replace('_', '\\_')
-                return '`'.join(parts)
-            text = _escape(text)
+            text = _escape_markdown(text)
         if self.dry_run:
             logger.info("[DRY-RUN] Telegram message:\n%s", text)
             return {"ok": True, "dry_run": True}
@@ -1,8 +1,10 @@
 import logging
 from binance.spot import Spot
+import numpy as np
 import pandas as pd
 from datetime import datetime, timezone, timedelta
-from src.indicators import bb_atr_signal
+from src.fetcher import BinanceFetcher
+from src.indicators import bb_atr_signal_np
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(name)s: %(message)s')
 
@@ -14,24 +16,22 @@ limit = 250
 
 client = Spot()
 raw = client.klines(symbol, interval, limit=limit)
-cols = ["open_time","open","high","low","close","volume","close_time","quote_volume","trades","taker_buy_base","taker_buy_quote","ignore"]
+# Plain float64 arrays straight from the klines; pandas is only used to print the last rows
+open_time = np.fromiter((k[0] for k in raw), dtype=np.int64, count=len(raw))
+_, high, low, close, _ = BinanceFetcher.raw_to_ohlcv_arrays(raw)
 
-df = pd.DataFrame(raw, columns=cols)
-for c in ["open","high","low","close","volume"]:
-    df[c] = df[c].astype(float)
+sig = bb_atr_signal_np(high, low, close, length=length, mult=mult)
 
-df['open_time'] = pd.to_datetime(df['open_time'], unit='ms', utc=True)
-
-df = df.set_index('open_time').sort_index()
-
-sig_df = bb_atr_signal(df, length=length, mult=mult)
-
-last_rows = sig_df.tail(5)[['bb_upper','bb_middle','bb_lower','bb_symmetry_ratio','bb_halfband','atr','bb_halfband_over_atr']]
+key_fields = ['bb_upper','bb_middle','bb_lower','bb_symmetry_ratio','bb_halfband','atr','bb_halfband_over_atr']
+last_rows = pd.DataFrame(
+    {c: getattr(sig, c)[-5:] for c in key_fields},
+    index=pd.to_datetime(open_time[-5:], unit='ms', utc=True).rename('open_time'),
+)
 print("Last 5 rows (key fields):")
 print(last_rows)
 
-valid_ratio = sig_df['bb_symmetry_ratio'].dropna()
-print('\nRatio unique values count:', valid_ratio.nunique())
-print('Ratio min:', valid_ratio.min())
-print('Ratio max:', valid_ratio.max())
+valid_ratio = sig.bb_symmetry_ratio[~np.isnan(sig.bb_symmetry_ratio)]
+print('\nRatio unique values count:', np.unique(valid_ratio).size)
+print('Ratio min:', valid_ratio.min() if valid_ratio.size else float('nan'))
+print('Ratio max:', valid_ratio.max() if valid_ratio.size else float('nan'))
 print('All equal to 1? ->', bool((valid_ratio == 1).all()))
@@ -1,60 +1,81 @@
-import yaml
 import os
+import sys
 import logging
-from dotenv import load_dotenv
 from src.telegram_bot import TelegramBot
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(name)s: %(message)s')
 
+# Set once ensure_tokens has put both credentials in the environment
+_TOKENS_OK = False
+
 def load_config(path: str = 'config.yaml'):
-    if not os.path.exists(path):
-        raise FileNotFoundError("config.yaml not found")
-    with open(path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    # Imported here (like dotenv in ensure_tokens) so runs that never need them skip the import cost
+    from src.config import load_yaml
+    try:
+        return load_yaml(path)
+    except FileNotFoundError:
+        raise FileNotFoundError("config.yaml not found") from None
+
+
+def _prompt(label: str) -> str:
+    # Plain stdin read: input() would import readline just for two values
+    sys.stdout.write(label)
+    sys.stdout.flush()
+    return sys.stdin.readline().strip()
 
 
 def ensure_tokens(cfg):
     """Ensure TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID are available via env.
     If missing, try from config; if still missing, prompt user and write to .env.
     """
-    bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-    chat_id = os.getenv('TELEGRAM_CHAT_ID')
+    global _TOKENS_OK
+    if _TOKENS_OK:
+        return
+    env = os.environ
+    bot_token = env.get('TELEGRAM_BOT_TOKEN')
+    chat_id = env.get('TELEGRAM_CHAT_ID')
     if bot_token and chat_id:
+        _TOKENS_OK = True
         return
     tg_cfg = cfg.get('telegram', {}) if isinstance(cfg, dict) else {}
     bot_token = bot_token or tg_cfg.get('bot_token') or ''
     chat_id = chat_id or tg_cfg.get('chat_id') or ''
     if bot_token and chat_id:
-        os.environ['TELEGRAM_BOT_TOKEN'] = bot_token
-        os.environ['TELEGRAM_CHAT_ID'] = chat_id
+        os.environ.update({'TELEGRAM_BOT_TOKEN': bot_token, 'TELEGRAM_CHAT_ID': chat_id})
+        _TOKENS_OK = True
         return
     # Prompt user to enter once and store to .env
     print("Telegram credentials not found. Enter them to create/update .env (kept locally):")
-    bot_token = input("BOT TOKEN: ").strip()
-    chat_id = input("CHAT ID: ").strip()
+    bot_token = _prompt("BOT TOKEN: ")
+    chat_id = _prompt("CHAT ID: ")
     if not bot_token or not chat_id:
         raise ValueError("Missing token or chat id. Aborting.")
     # Append or create .env
-    lines = [f"TELEGRAM_BOT_TOKEN={bot_token}\n", f"TELEGRAM_CHAT_ID={chat_id}\n"]
     try:
-        with open('.env', 'a', encoding='utf-8') as f:
-            for line in lines:
-                f.write(line)
+        # Raw append in one write(); a newly created file is readable by the owner only (tokens are secrets)
+        fd = os.open('.env', os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        try:
+            os.write(fd, f"TELEGRAM_BOT_TOKEN={bot_token}\nTELEGRAM_CHAT_ID={chat_id}\n".encode('utf-8'))
+        finally:
+            os.close(fd)
         # Reload
+        from dotenv import load_dotenv
         load_dotenv(override=True)
     except Exception as e:
         print(f"Failed to write .env: {e}")
-        os.environ['TELEGRAM_BOT_TOKEN'] = bot_token
-        os.environ['TELEGRAM_CHAT_ID'] = chat_id
+        os.environ.update({'TELEGRAM_BOT_TOKEN': bot_token, 'TELEGRAM_CHAT_ID': chat_id})
+    _TOKENS_OK = True
 
 
 def main():
-    # Load environment variables from .env if present
-    load_dotenv()
+    # Load environment variables from .env if present (not needed when both tokens are already exported)
+    if not (os.environ.get('TELEGRAM_BOT_TOKEN') and os.environ.get('TELEGRAM_CHAT_ID')):
+        from dotenv import load_dotenv
+        load_dotenv()
     cfg = load_config()
     ensure_tokens(cfg)
-    tg_cfg = cfg.get('telegram', {})
-    bot = TelegramBot(tg_cfg.get('bot_token'), tg_cfg.get('chat_id'), tg_cfg.get('parse_mode','Markdown'))
+    tg = cfg.get('telegram') or {}
+    bot = TelegramBot(tg.get('bot_token'), tg.get('chat_id'), tg.get('parse_mode') or 'Markdown')
     resp = bot.send_message("Test message from tradingview project ✅")
     print(resp)
 